@@ -0,0 +1,36 @@
+import threading
+import time
+from functools import wraps
+
+
+def ttl_cache(seconds):
+    """
+    Caches a function's results in-process for `seconds`, keyed by its arguments.
+    Empty results (None, []) are not cached so failed fetches are retried next call.
+    """
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with lock:
+                entry = cache.get(key)
+                if entry and entry[0] > now:
+                    return entry[1]
+
+            result = func(*args, **kwargs)
+            if result:
+                with lock:
+                    cache[key] = (now + seconds, result)
+            return result
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
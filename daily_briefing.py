@@ -1,13 +1,47 @@
+import orjson
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+try:
+    # lxml filters <item> elements in C and skips entity expansion from remote feeds
+    from lxml import etree as ET
+    ITERPARSE_OPTIONS = {"tag": "item", "resolve_entities": False}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    ITERPARSE_OPTIONS = {}
 import os
 import json
+import bisect
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from cache import ttl_cache
 
 SILICONFLOW_API_KEY = os.environ.get("SILICONFLOW_API_KEY")
 SILICONFLOW_API_URL = "https://api.siliconflow.cn/v1/chat/completions"
 SILICONFLOW_MODEL = "deepseek-ai/DeepSeek-V3.1-Terminus"  # Using DeepSeek V3 as requested/appropriate
 
+# Shared HTTP session so repeated calls reuse pooled keep-alive connections
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=3, backoff_factor=0.3))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# Clothing advice by max temperature (°C): TEMP_MSGS[i] applies below TEMP_BREAKS[i]
+TEMP_BREAKS = [0, 10, 20, 25]
+TEMP_MSGS = [
+    "It's freezing! Wear a heavy winter coat, scarf, gloves, and a hat.",
+    "It's cold. Wear a warm coat and maybe a scarf.",
+    "It's chilly. A jacket or a sweater should be good.",
+    "It's pleasant. A light jacket or long sleeves.",
+    "It's warm! T-shirt and shorts weather.",
+]
+
+# WMO Weather interpretation codes
+# 0-3: Clear/Cloudy, 51-67: Drizzle/Rain, 71-77: Snow, 80-82: Showers, 95-99: Thunderstorm
+RAIN_CODES = frozenset(range(51, 68)) | frozenset(range(80, 83)) | frozenset(range(95, 100))
+SNOW_CODES = frozenset(range(71, 78))
+
+@ttl_cache(seconds=10 * 60)
 def get_weather_evanston():
     """
     Fetches weather for Evanston, IL using Open-Meteo API.
@@ -16,9 +50,9 @@ def get_weather_evanston():
     try:
         # Evanston coordinates: 42.0451, -87.6877
         url = "https://api.open-meteo.com/v1/forecast?latitude=42.0451&longitude=-87.6877&daily=weathercode,temperature_2m_max,temperature_2m_min,precipitation_probability_max&current_weather=true&timezone=America%2FChicago"
-        response = requests.get(url, timeout=10)
+        response = SESSION.get(url, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         current = data.get("current_weather", {})
         daily = data.get("daily", {})
@@ -55,21 +89,11 @@ def get_clothing_recommendation(weather_data):
     recommendation = []
     
     # Temperature based
-    if temp < 0:
-        recommendation.append("It's freezing! Wear a heavy winter coat, scarf, gloves, and a hat.")
-    elif temp < 10:
-        recommendation.append("It's cold. Wear a warm coat and maybe a scarf.")
-    elif temp < 20:
-        recommendation.append("It's chilly. A jacket or a sweater should be good.")
-    elif temp < 25:
-        recommendation.append("It's pleasant. A light jacket or long sleeves.")
-    else:
-        recommendation.append("It's warm! T-shirt and shorts weather.")
+    recommendation.append(TEMP_MSGS[bisect.bisect_right(TEMP_BREAKS, temp)])
         
-    # Rain/Snow based (WMO Weather interpretation codes)
-    # 0-3: Clear/Cloudy, 51-67: Drizzle/Rain, 71-77: Snow, 80-82: Showers, 95-99: Thunderstorm
-    is_raining = (51 <= code <= 67) or (80 <= code <= 82) or (95 <= code <= 99)
-    is_snowing = (71 <= code <= 77)
+    # Rain/Snow based
+    is_raining = code in RAIN_CODES
+    is_snowing = code in SNOW_CODES
     
     if is_raining or precip > 40:
         recommendation.append("Don't forget an umbrella ☂️, it might rain.")
@@ -78,6 +102,27 @@ def get_clothing_recommendation(weather_data):
         
     return " ".join(recommendation)
 
+def fetch_feed_items(url, limit=5):
+    """
+    Streams a single RSS feed and returns its first `limit` items.
+    Parsing stops as soon as enough items are seen, so the rest of the feed is never read.
+    """
+    items = []
+    with SESSION.get(url, timeout=5, stream=True) as response:
+        if response.status_code != 200:
+            return items
+        response.raw.decode_content = True
+        
+        for _, elem in ET.iterparse(response.raw, events=("end",), **ITERPARSE_OPTIONS):
+            if elem.tag != "item":
+                continue
+            items.append({"title": elem.findtext("title"), "link": elem.findtext("link")})
+            elem.clear()
+            if len(items) >= limit:
+                break
+    return items
+
+@ttl_cache(seconds=15 * 60)
 def get_raw_news_headlines():
     """
     Fetches raw news headlines from multiple BBC News RSS feeds.
@@ -93,33 +138,34 @@ def get_raw_news_headlines():
     all_news = []
     seen_titles = set()
     
-    for url in feeds:
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code != 200:
-                continue
-                
-            root = ET.fromstring(response.content)
-            # Get top 5 from each feed
-            for item in root.findall("./channel/item")[:5]:
-                title = item.find("title").text
-                link = item.find("link").text
-                
-                if title not in seen_titles:
-                    all_news.append({"title": title, "link": link})
-                    seen_titles.add(title)
-        except Exception as e:
-            print(f"Error fetching news from {url}: {e}")
+    # Fetch all feeds concurrently, then merge in feed order so Top Stories stay first
+    with ThreadPoolExecutor(max_workers=len(feeds)) as executor:
+        futures = [(url, executor.submit(fetch_feed_items, url)) for url in feeds]
+        for url, future in futures:
+            try:
+                # Get top 5 from each feed
+                for item in future.result():
+                    if item["title"] not in seen_titles:
+                        all_news.append(item)
+                        seen_titles.add(item["title"])
+            except Exception as e:
+                print(f"Error fetching news from {url}: {e}")
             
     return all_news
 
+def format_plain_headlines(news_items, limit=5):
+    """
+    Formats the first few headlines as Slack bullet links, used when AI ranking is unavailable.
+    """
+    return "\n".join([f"• <{item['link']}|{item['title']}>" for item in news_items[:limit]])
+
 def organize_news_with_ai(news_items):
     """
     Uses SiliconFlow API to organize and rank news.
     """
     if not SILICONFLOW_API_KEY:
         # Fallback if no API key
-        return "\n".join([f"• <{item['link']}|{item['title']}>" for item in news_items[:5]])
+        return format_plain_headlines(news_items)
 
     news_text = "\n".join([f"- {item['title']} ({item['link']})" for item in news_items])
     
@@ -156,14 +202,14 @@ def organize_news_with_ai(news_items):
     }
     
     try:
-        response = requests.post(SILICONFLOW_API_URL, json=payload, headers=headers, timeout=30)
+        response = SESSION.post(SILICONFLOW_API_URL, data=orjson.dumps(payload), headers=headers, timeout=30)
         response.raise_for_status()
-        result = response.json()
+        result = orjson.loads(response.content)
         return result['choices'][0]['message']['content']
     except Exception as e:
         print(f"Error calling SiliconFlow API: {e}")
         # Fallback
-        return "\n".join([f"• <{item['link']}|{item['title']}>" for item in news_items[:5]])
+        return format_plain_headlines(news_items)
 
 def generate_daily_briefing():
     """
@@ -172,8 +218,14 @@ def generate_daily_briefing():
     # Date
     today = datetime.now().strftime("%A, %B %d, %Y")
     
+    # Weather and news are independent, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        weather_future = executor.submit(get_weather_evanston)
+        news_future = executor.submit(get_raw_news_headlines)
+        weather = weather_future.result()
+        raw_news = news_future.result()
+    
     # Weather
-    weather = get_weather_evanston()
     if weather:
         weather_str = f"🌡️ *Current:* {weather['current_temp']}°C | *High:* {weather['max_temp']}°C | *Low:* {weather['min_temp']}°C"
     else:
@@ -183,7 +235,6 @@ def generate_daily_briefing():
     clothing = get_clothing_recommendation(weather)
     
     # News
-    raw_news = get_raw_news_headlines()
     if raw_news:
         news_section = organize_news_with_ai(raw_news)
     else:
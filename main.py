@@ -1,18 +1,31 @@
 import os
+import re
 import hmac
 import hashlib
 import time
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from slack_sdk.web import WebClient
-import pytz
-import requests
-from icalendar import Calendar
-from daily_briefing import generate_daily_briefing
+from cache import ttl_cache
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for faster request parsing and jsonify"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
-TIMEZONE = "America/Chicago"
+DEFAULT_TIMEZONE = "America/Chicago"
 CALENDAR_URL = "https://calendar.google.com/calendar/ical/075a102c47c915f5617b04d1d9b947c302f33e8a848567712ad3e3461e8206c9%40group.calendar.google.com/public/basic.ics"
 
 # Get environment variables
@@ -27,36 +40,136 @@ except Exception as e:
     app.logger.error(f"Failed to initialize Slack client: {e}")
     client = None
 
+@lru_cache(maxsize=64)
+def _tz(name):
+    """Cached ZoneInfo lookup"""
+    return ZoneInfo(name)
+
+# Current bot timezone; read via _current_tz[0], replaced only under _TZ_LOCK
+_TZ_LOCK = threading.Lock()
+_current_tz = [_tz(DEFAULT_TIMEZONE)]
+
+# Mention keywords, matched as whole words in a single pass over the text
+INTENT_RE = re.compile(r"\b(hello|hi|timezone|date|time|day|brief(?:ing)?|next events?|today|this week|events?|calendar|todo)\b")
+INTENT_ALIASES = {"briefing": "brief", "next events": "next event", "events": "event"}
+
+# Reply date/time formats
+_FMT_NOW = "%Y-%m-%d %H:%M:%S %Z"
+_FMT_DAY = "%A, %B %d at %I:%M %p"
+_FMT_TIME = "%I:%M %p"
+_FMT_WEEK = "%a %b %d, %I:%M %p"
+_FMT_DATE = "%Y-%m-%d"
+
+# Background workers for Slack mentions, so the events endpoint can ack immediately
+EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+def unfold_ical_lines(lines):
+    """Join RFC 5545 folded continuation lines back into whole content lines"""
+    current = None
+    for line in lines:
+        if not line:
+            continue
+        if line[0] in " \t":
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def parse_ical_datetime(params, value, tz):
+    """Parse a DTSTART value into an aware datetime in tz (None for all-day dates)"""
+    if "T" not in value:
+        return None
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return dt.replace(tzinfo=timezone.utc).astimezone(tz)
+    for param in params:
+        if param.upper().startswith("TZID="):
+            try:
+                return dt.replace(tzinfo=_tz(param[5:].strip('"'))).astimezone(tz)
+            except (ZoneInfoNotFoundError, ValueError):
+                break
+    return dt.replace(tzinfo=tz)
+
+def unescape_ical_text(value):
+    """Undo iCal TEXT escaping of backslashes, commas, semicolons and newlines"""
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+def parse_ical_events(lines, tz, start, end):
+    """
+    Scan iCal lines for VEVENTs starting within [start, end].
+    Only DTSTART and SUMMARY are kept, and an event is skipped as soon as its
+    DTSTART falls outside the window, so out-of-range events never become objects.
+    """
+    events = []
+    in_event = False
+    skip = False
+    depth = 0
+    start_dt = None
+    summary = None
+    
+    for line in unfold_ical_lines(lines):
+        if line == "BEGIN:VEVENT":
+            in_event, skip, depth, start_dt, summary = True, False, 0, None, None
+            continue
+        if not in_event:
+            continue
+        if line == "END:VEVENT":
+            in_event = False
+            if start_dt is not None and not skip:
+                events.append({
+                    'start': start_dt,
+                    'summary': unescape_ical_text(summary) if summary is not None else 'No title'
+                })
+            continue
+        if skip:
+            continue
+        
+        # Skip properties of nested components such as VALARM
+        if line.startswith("BEGIN:"):
+            depth += 1
+            continue
+        if line.startswith("END:"):
+            depth -= 1
+            continue
+        if depth:
+            continue
+        
+        name, _, value = line.partition(":")
+        name, *params = name.split(";")
+        name = name.upper()
+        if name == "DTSTART":
+            start_dt = parse_ical_datetime(params, value, tz)
+            # Only include future events within the date range
+            if start_dt is None or not start <= start_dt <= end:
+                skip = True
+        elif name == "SUMMARY":
+            summary = value
+    
+    return events
+
+@ttl_cache(seconds=5 * 60)
 def get_calendar_events(days=7):
     """Fetch calendar events from iCal feed"""
+    # Deferred so cold starts (e.g. /health) don't pay for the HTTP stack
+    from daily_briefing import SESSION
+
     try:
-        response = requests.get(CALENDAR_URL, timeout=10)
-        response.raise_for_status()
-        
-        cal = Calendar.from_ical(response.content)
-        tz = pytz.timezone(TIMEZONE)
+        tz = _current_tz[0]
         now = datetime.now(tz)
         end_date = now + timedelta(days=days)
         
-        events = []
-        for component in cal.walk():
-            if component.name == "VEVENT":
-                dtstart = component.get('dtstart').dt
-                summary = str(component.get('summary', 'No title'))
-                
-                # Convert to timezone-aware datetime if needed
-                if isinstance(dtstart, datetime):
-                    if dtstart.tzinfo is None:
-                        dtstart = tz.localize(dtstart)
-                    else:
-                        dtstart = dtstart.astimezone(tz)
-                    
-                    # Only include future events within the date range
-                    if now <= dtstart <= end_date:
-                        events.append({
-                            'start': dtstart,
-                            'summary': summary
-                        })
+        # Stream the feed so parsing overlaps the download and the body is never buffered whole
+        with SESSION.get(CALENDAR_URL, stream=True, timeout=10) as response:
+            response.raise_for_status()
+            # iCalendar is UTF-8 by spec, regardless of what the Content-Type says
+            response.encoding = "utf-8"
+            
+            lines = response.iter_lines(chunk_size=8192, decode_unicode=True)
+            events = parse_ical_events(lines, tz, now, end_date)
         
         # Sort by start time
         events.sort(key=lambda x: x['start'])
@@ -87,14 +200,23 @@ def verify_slack_request(req):
         app.logger.error("SLACK_SIGNING_SECRET not configured")
         return False
 
-    sig_basestring = f"v0:{timestamp}:{req.get_data().decode('utf-8')}"
-    my_signature = "v0=" + hmac.new(
-        SLACK_SIGNING_SECRET.encode(),
-        sig_basestring.encode(),
-        hashlib.sha256
-    ).hexdigest()
+    # Decode Slack's hex signature once and compare raw digest bytes
+    try:
+        if not slack_signature.startswith("v0="):
+            raise ValueError("unsupported signature version")
+        expected_digest = bytes.fromhex(slack_signature[3:])
+    except ValueError as e:
+        app.logger.warning(f"Malformed signature: {slack_signature}, error: {e}")
+        return False
+
+    # Feed the signature base string ("v0:<timestamp>:<body>") as raw bytes
+    mac = hmac.new(SLACK_SIGNING_SECRET.encode(), b"v0:", hashlib.sha256)
+    mac.update(timestamp.encode())
+    mac.update(b":")
+    mac.update(req.get_data())
+    my_digest = mac.digest()
 
-    return hmac.compare_digest(my_signature, slack_signature)
+    return hmac.compare_digest(my_digest, expected_digest)
 
 def send_daily_briefing():
     """Send the daily briefing to the default channel"""
@@ -102,6 +224,8 @@ def send_daily_briefing():
         print("Slack client not initialized, skipping daily briefing")
         return False
 
+    from daily_briefing import generate_daily_briefing
+
     try:
         message = generate_daily_briefing()
         client.chat_postMessage(channel=SLACK_DEFAULT_CHANNEL, text=message)
@@ -133,6 +257,104 @@ def health():
 ###########################
 # Main slack messaging code 
 ###########################
+def handle_mention(event):
+    """Respond to an @snuffles mention (runs on the background executor)"""
+    text = event.get("text", "").lower()
+    channel = event["channel"]
+    
+    intents = {INTENT_ALIASES.get(m, m) for m in INTENT_RE.findall(text)}
+    
+    app.logger.info(f"Received app_mention: {text}")
+
+    try:
+        if intents & {"hi", "hello"}: #test function
+            response = client.chat_postMessage(channel=channel, text="Hi there! I am Snuffles.")
+            app.logger.info(f"Sent greeting response: {response['ok']}")
+        if intents & {"date", "time", "day"}: #test time function
+            now = datetime.now(_current_tz[0])
+            formatted_time = now.strftime(_FMT_NOW)
+            client.chat_postMessage(channel=channel, text=f"The current date and time is: {formatted_time}")
+        if "timezone" in intents:
+            # Zone names are case-sensitive, so take them from the original text
+            new_tz = re.split("timezone", event.get("text", ""), flags=re.IGNORECASE)[-1].strip()
+            try:
+                tz = _tz(new_tz)
+                with _TZ_LOCK:
+                    _current_tz[0] = tz
+                # Cached events were localized to the old timezone
+                get_calendar_events.cache_clear()
+                client.chat_postMessage(channel=channel, text=f"Timezone updated to: {tz.key}")
+            except (ZoneInfoNotFoundError, ValueError):
+                client.chat_postMessage(channel=channel, text=f"Error: '{new_tz}' is not a valid timezone. Use format like 'America/New_York', 'China/Shanghai'")
+        
+        if "brief" in intents:
+            from daily_briefing import generate_daily_briefing
+            msg = generate_daily_briefing()
+            client.chat_postMessage(channel=channel, text=msg)
+
+        # Calendar commands
+        if "next event" in intents:
+            events = get_calendar_events(days=30)
+            if events is None:
+                client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
+            elif len(events) == 0:
+                client.chat_postMessage(channel=channel, text="No upcoming events found.")
+            else:
+                event = events[0]
+                time_str = event['start'].strftime(_FMT_DAY)
+                client.chat_postMessage(channel=channel, text=f"📅 Next event: *{event['summary']}*\n🕐 {time_str}")
+        
+        elif "today" in intents and intents & {"event", "calendar"}:
+            events = get_calendar_events(days=1)
+            if events is None:
+                client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
+            elif len(events) == 0:
+                client.chat_postMessage(channel=channel, text="No events today.")
+            else:
+                parts = ["📅 *Today's events:*\n"]
+                parts.extend(f"• {event['start'].strftime(_FMT_TIME)} - {event['summary']}\n" for event in events)
+                msg = "".join(parts)
+                client.chat_postMessage(channel=channel, text=msg)
+        
+        elif "this week" in intents and intents & {"event", "calendar"}:
+            events = get_calendar_events(days=7)
+            if events is None:
+                client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
+            elif len(events) == 0:
+                client.chat_postMessage(channel=channel, text="No events this week.")
+            else:
+                parts = ["📅 *This week's events:*\n"]
+                parts.extend(f"• {event['start'].strftime(_FMT_WEEK)} - {event['summary']}\n" for event in events)
+                msg = "".join(parts)
+                client.chat_postMessage(channel=channel, text=msg)
+        
+        elif "calendar" in intents:
+            events = get_calendar_events(days=7)
+            if events is None:
+                client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
+            elif len(events) == 0:
+                client.chat_postMessage(channel=channel, text="No upcoming events in the next 7 days.")
+            else:
+                parts = ["📅 *Upcoming events (next 7 days):*\n"]
+                parts.extend(f"• {event['start'].strftime(_FMT_WEEK)} - {event['summary']}\n" for event in events)
+                msg = "".join(parts)
+                client.chat_postMessage(channel=channel, text=msg)
+        
+        # Todo list command
+        if "todo" in intents:
+            todos = [
+                {"task": "Math homework", "date": datetime(2025, 11, 23), "notes": "Section 14.5"}
+            ]
+            
+            parts = ["📝 *To-Do List:*\n"]
+            parts.extend(f"• {todo['date'].strftime(_FMT_DATE)} - {todo['task']}: {todo['notes']}\n" for todo in todos)
+            msg = "".join(parts)
+            client.chat_postMessage(channel=channel, text=msg)
+            
+    except Exception as e:
+        app.logger.error(f"Error handling app_mention: {e}")
+        app.logger.error(f"Client: {client}, Token set: {bool(SLACK_BOT_TOKEN)}")
+
 @app.route("/slack/events", methods=["POST"])
 def slack_events():
     data = request.json
@@ -155,107 +377,9 @@ def slack_events():
     if event.get("subtype") == "bot_message":
         return jsonify({"ok": True})
 
-    # Handle @snuffles mentions
+    # Handle @snuffles mentions off the request thread so Slack gets its ack within 3s
     if event.get("type") == "app_mention":
-        global TIMEZONE
-        
-        text = event.get("text", "").lower()
-        channel = event["channel"]
-        
-        app.logger.info(f"Received app_mention: {text}")
-
-        try:
-            if "hi" in text or "hello" in text: #test function
-                response = client.chat_postMessage(channel=channel, text="Hi there! I am Snuffles.")
-                app.logger.info(f"Sent greeting response: {response['ok']}")
-            if "date" in text or "time" in text or "day" in text: #test time function
-                try:
-                    tz = pytz.timezone(TIMEZONE)
-                    now = datetime.now(tz)
-                    formatted_time = now.strftime("%Y-%m-%d %H:%M:%S %Z")
-                    client.chat_postMessage(channel=channel, text=f"The current date and time is: {formatted_time}")
-                except pytz.exceptions.UnknownTimeZoneError:
-                    client.chat_postMessage(channel=channel, text=f"Error: Invalid timezone '{TIMEZONE}'")
-            if "timezone" in text:
-                new_tz = text.split("timezone")[-1].strip()
-                try:
-                    pytz.timezone(new_tz)
-                    TIMEZONE = new_tz
-                    client.chat_postMessage(channel=channel, text=f"Timezone updated to: {TIMEZONE}")
-                except pytz.exceptions.UnknownTimeZoneError:
-                    client.chat_postMessage(channel=channel, text=f"Error: '{new_tz}' is not a valid timezone. Use format like 'America/New_York', 'China/Shanghai'")
-            
-            if "brief" in text:
-                msg = generate_daily_briefing()
-                client.chat_postMessage(channel=channel, text=msg)
-
-            # Calendar commands
-            if "next event" in text:
-                events = get_calendar_events(days=30)
-                if events is None:
-                    client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
-                elif len(events) == 0:
-                    client.chat_postMessage(channel=channel, text="No upcoming events found.")
-                else:
-                    event = events[0]
-                    time_str = event['start'].strftime("%A, %B %d at %I:%M %p")
-                    client.chat_postMessage(channel=channel, text=f"📅 Next event: *{event['summary']}*\n🕐 {time_str}")
-            
-            elif "today" in text and ("event" in text or "calendar" in text):
-                events = get_calendar_events(days=1)
-                if events is None:
-                    client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
-                elif len(events) == 0:
-                    client.chat_postMessage(channel=channel, text="No events today.")
-                else:
-                    msg = "📅 *Today's events:*\n"
-                    for event in events:
-                        time_str = event['start'].strftime("%I:%M %p")
-                        msg += f"• {time_str} - {event['summary']}\n"
-                    client.chat_postMessage(channel=channel, text=msg)
-            
-            elif "this week" in text and ("event" in text or "calendar" in text):
-                events = get_calendar_events(days=7)
-                if events is None:
-                    client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
-                elif len(events) == 0:
-                    client.chat_postMessage(channel=channel, text="No events this week.")
-                else:
-                    msg = "📅 *This week's events:*\n"
-                    for event in events:
-                        time_str = event['start'].strftime("%a %b %d, %I:%M %p")
-                        msg += f"• {time_str} - {event['summary']}\n"
-                    client.chat_postMessage(channel=channel, text=msg)
-            
-            elif "calendar" in text and "next event" not in text:
-                events = get_calendar_events(days=7)
-                if events is None:
-                    client.chat_postMessage(channel=channel, text="Sorry, I couldn't fetch the calendar.")
-                elif len(events) == 0:
-                    client.chat_postMessage(channel=channel, text="No upcoming events in the next 7 days.")
-                else:
-                    msg = "📅 *Upcoming events (next 7 days):*\n"
-                    for event in events:
-                        time_str = event['start'].strftime("%a %b %d, %I:%M %p")
-                        msg += f"• {time_str} - {event['summary']}\n"
-                    client.chat_postMessage(channel=channel, text=msg)
-            
-            # Todo list command
-            if "todo" in text:
-                todos = [
-                    {"task": "Math homework", "date": datetime(2025, 11, 23), "notes": "Section 14.5"}
-                ]
-                
-                msg = "📝 *To-Do List:*\n"
-                for todo in todos:
-                    date_str = todo['date'].strftime("%Y-%m-%d")
-                    msg += f"• {date_str} - {todo['task']}: {todo['notes']}\n"
-                client.chat_postMessage(channel=channel, text=msg)
-                
-        except Exception as e:
-            app.logger.error(f"Error handling app_mention: {e}")
-            app.logger.error(f"Client: {client}, Token set: {bool(SLACK_BOT_TOKEN)}")
- 
+        EXECUTOR.submit(handle_mention, event)
 
     return jsonify({"ok": True})
 